@@ -27,11 +27,26 @@ AUTOR: Script corrigido com registradores oficiais da documentação EletechSup
 from modbus_25iob16_pymodbus import Modbus25IOB16Pymodbus
 import time
 import os
+import json
+import glob
 from dotenv import load_dotenv
 
 # Carrega variáveis de ambiente do arquivo .env
 load_dotenv()
 
+INTERVALO_TESTE_IO = 0.05   # Teste contínuo: leitura de entradas/saídas a cada 50ms
+INTERVALO_TESTE_MODO = 1.0  # Teste contínuo: releitura do registrador de modo a cada 1s
+
+def _resumo_correspondencia(entradas, saidas):
+    """Linhas com as portas ativas e total de canais com entrada = saída (bitmasks de 16 bits)"""
+    entradas_ativas = [i + 1 for i in range(16) if (entradas >> i) & 1]
+    saidas_ativas = [i + 1 for i in range(16) if (saidas >> i) & 1]
+    linhas = [f"Entradas ativas: {entradas_ativas or 'Nenhuma'}",
+              f"Saídas ativas: {saidas_ativas or 'Nenhuma'}"]
+    # Canais iguais = bits zerados no XOR; conta os bits de ~(e ^ s)
+    correspondencias = bin(~(entradas ^ saidas) & 0xFFFF).count('1')
+    return linhas, correspondencias
+
 class ConfiguradorLogicaInterna:
     def __init__(self, ip_modbus, porta=502, unit_id=1):
         self.modbus = Modbus25IOB16Pymodbus(ip_modbus, porta, unit_id)
@@ -52,6 +67,31 @@ class ConfiguradorLogicaInterna:
             'mapeamento_1_1': 0x0005   # Output = Input (mapeamento direto 1:1)
         }
         
+        # Ordem dos modos para os menus numerados (montada uma vez)
+        self.LISTA_MODOS = list(self.MODOS)
+        
+        # Mapa inverso valor → nome (tradução do registrador em O(1))
+        self.MODOS_INV = {valor: nome for nome, valor in self.MODOS.items()}
+        
+        # Textos fixos dos modos, montados uma vez
+        self.DESCRICOES = {
+            'desabilitado': 'Sem relação entre entradas e saídas (controle manual)',
+            'auto_travamento': 'Entrada ativa trava a saída correspondente (self-locking)',
+            'inter_todos': 'Entradas controlam saídas com intertravamento global',
+            'momentaneo': 'Saídas ativas apenas enquanto entradas estiverem ativas',
+            'inter_2canais': 'Intertravamento entre pares de canais',
+            'mapeamento_1_1': 'Mapeamento direto 1:1 - Entrada N controla Saída N'
+        }
+        self.EXPLICACOES = {
+            'desabilitado': 'Lógica interna desativada - controle manual das saídas',
+            'auto_travamento': 'Entradas travam as saídas correspondentes',
+            'inter_todos': 'Sistema de intertravamento ativo em todos canais',
+            'momentaneo': 'Saídas ativas apenas com entradas ativas',
+            'inter_2canais': 'Intertravamento por pares de canais',
+            'mapeamento_1_1': 'MAPEAMENTO AUTOMÁTICO 1:1 ATIVO - Hardware controla as saídas',
+            'desconhecido': 'Modo não reconhecido - verifique o valor'
+        }
+        
     def conectar(self):
         """Estabelece conexão com o módulo"""
         print("🔌 Conectando ao módulo 25IOB16...")
@@ -70,42 +110,38 @@ class ConfiguradorLogicaInterna:
     
     def ler_modo_atual(self):
         """Lê o modo de lógica interna atual do módulo"""
-        try:
-            result = self.modbus.client.read_holding_registers(self.REG_LOGICA_INTERNA, count=1, device_id=self.modbus.unit_id)
-            if not result.isError():
-                modo_valor = result.registers[0]
-                
-                # Converte valor numérico para nome do modo
-                for nome, valor in self.MODOS.items():
-                    if valor == modo_valor:
-                        return nome, modo_valor
-                
-                return 'desconhecido', modo_valor
-            else:
-                print(f"❌ Erro ao ler modo atual: {result}")
-                return None, None
-        except Exception as e:
-            print(f"❌ Exceção ao ler modo atual: {e}")
+        # Usa as primitivas do driver: reconecta sozinho se o gateway derrubou a sessão
+        registradores = self.modbus.le_registradores(self.REG_LOGICA_INTERNA, 1)
+        if registradores is None:
+            print("❌ Erro ao ler modo atual")
             return None, None
+        
+        modo_valor = registradores[0]
+        
+        # Converte valor numérico para nome do modo
+        modo_nome = self.MODOS_INV.get(modo_valor, 'desconhecido')
+        return modo_nome, modo_valor
     
     def configurar_modo(self, modo_nome):
         """Configura o modo de lógica interna do módulo"""
         if modo_nome not in self.MODOS:
             print(f"❌ Modo '{modo_nome}' não suportado!")
-            print(f"   Modos disponíveis: {list(self.MODOS.keys())}")
+            print(f"   Modos disponíveis: {self.LISTA_MODOS}")
             return False
             
-        try:
-            modo_valor = self.MODOS[modo_nome]
-            result = self.modbus.client.write_register(self.REG_LOGICA_INTERNA, modo_valor, device_id=self.modbus.unit_id)
-            if not result.isError():
-                return True
-            else:
-                print(f"❌ Erro ao configurar modo '{modo_nome}': {result}")
-                return False
-        except Exception as e:
-            print(f"❌ Exceção ao configurar modo '{modo_nome}': {e}")
-            return False
+        modo_valor = self.MODOS[modo_nome]
+        
+        # Não reescreve o registrador se o módulo já está no modo (leitura falha = escreve)
+        atual = self.modbus.le_registradores(self.REG_LOGICA_INTERNA, 1)
+        if atual is not None and atual[0] == modo_valor:
+            print(f"   ℹ️ Modo '{modo_nome}' já está ativo - escrita dispensada")
+            return True
+        
+        if self.modbus.escreve_registrador(self.REG_LOGICA_INTERNA, modo_valor):
+            return True
+        
+        print(f"❌ Erro ao configurar modo '{modo_nome}'")
+        return False
     
     def ativar_mapeamento_1_para_1(self):
         """Ativa mapeamento 1:1 usando o modo oficial do módulo"""
@@ -125,17 +161,8 @@ class ConfiguradorLogicaInterna:
         """Lista todos os modos de lógica interna disponíveis"""
         print("\n📝 MODOS DE LÓGICA INTERNA DISPONÍVEIS:")
         
-        descricoes = {
-            'desabilitado': 'Sem relação entre entradas e saídas (controle manual)',
-            'auto_travamento': 'Entrada ativa trava a saída correspondente (self-locking)',
-            'inter_todos': 'Entradas controlam saídas com intertravamento global',
-            'momentaneo': 'Saídas ativas apenas enquanto entradas estiverem ativas',
-            'inter_2canais': 'Intertravamento entre pares de canais',
-            'mapeamento_1_1': 'Mapeamento direto 1:1 - Entrada N controla Saída N'
-        }
-        
         for i, (modo, valor) in enumerate(self.MODOS.items(), 1):
-            descricao = descricoes.get(modo, 'Descrição não disponível')
+            descricao = self.DESCRICOES.get(modo, 'Descrição não disponível')
             print(f"   {i}. {modo.upper().replace('_', ' ')}") 
             print(f"      • Valor: 0x{valor:04X}")
             print(f"      • {descricao}")
@@ -156,17 +183,7 @@ class ConfiguradorLogicaInterna:
         print(f"   • Registrador usado: {self.REG_LOGICA_INTERNA} (0x{self.REG_LOGICA_INTERNA:02X})")
         
         # Explicação do modo atual
-        explicacoes = {
-            'desabilitado': 'Lógica interna desativada - controle manual das saídas',
-            'auto_travamento': 'Entradas travam as saídas correspondentes',
-            'inter_todos': 'Sistema de intertravamento ativo em todos canais',
-            'momentaneo': 'Saídas ativas apenas com entradas ativas',
-            'inter_2canais': 'Intertravamento por pares de canais',
-            'mapeamento_1_1': 'MAPEAMENTO AUTOMÁTICO 1:1 ATIVO - Hardware controla as saídas',
-            'desconhecido': 'Modo não reconhecido - verifique o valor'
-        }
-        
-        explicacao = explicacoes.get(modo_nome, 'Modo não documentado')
+        explicacao = self.EXPLICACOES.get(modo_nome, 'Modo não documentado')
         print(f"   ℹ️ Status: {explicacao}")
     
     def desativar_logica_interna(self):
@@ -215,21 +232,17 @@ class ConfiguradorLogicaInterna:
         print("\n   • Pressione Enter para verificar estados atuais...")
         input()
         
-        # Lê e mostra estados atuais
-        entradas = self.modbus.le_status_entradas()
-        saidas_digitais = self.modbus.le_status_saidas_digitais()
+        # Lê e mostra estados atuais (bitmasks de 16 bits: bit N = canal N+1)
+        entradas, saidas_digitais = self.modbus.le_mascaras()
         
         if entradas is not None and saidas_digitais is not None:
             print(f"\n   📡 ESTADOS ATUAIS:")
             
-            entradas_ativas = [i+1 for i, x in enumerate(entradas) if x]
-            saidas_ativas = [i+1 for i, x in enumerate(saidas_digitais) if x]
-            
-            print(f"   • Entradas ativas: {entradas_ativas if entradas_ativas else 'Nenhuma'}")
-            print(f"   • Saídas ativas: {saidas_ativas if saidas_ativas else 'Nenhuma'}")
+            linhas, correspondencias = _resumo_correspondencia(entradas, saidas_digitais)
+            for linha in linhas:
+                print(f"   • {linha}")
             
             if modo_atual == 'mapeamento_1_1':
-                correspondencias = sum(1 for i in range(16) if entradas[i] == saidas_digitais[i])
                 print(f"   • Correspondências 1:1: {correspondencias}/16")
                 
                 if correspondencias == 16:
@@ -241,10 +254,51 @@ class ConfiguradorLogicaInterna:
         else:
             print("   ❌ Erro ao ler estados das entradas/saídas")
     
+    def testar_logica_interna_loop(self, duracao=30):
+        """Acompanha continuamente entradas x saídas por até `duracao` segundos (Ctrl+C encerra)"""
+        print(f"\n🧪 Teste Contínuo da Lógica Interna ({duracao}s - Ctrl+C para sair)...")
+        
+        modo_atual, _ = self.ler_modo_atual()
+        if modo_atual is None:
+            print("   ❌ Não foi possível verificar o modo atual")
+            return
+        print(f"   • Modo ativo: {modo_atual.upper().replace('_', ' ')}")
+        
+        inicio = time.monotonic()
+        proxima_leitura_modo = inicio + INTERVALO_TESTE_MODO
+        ultimo_estado = None
+        
+        try:
+            while True:
+                agora = time.monotonic()
+                if agora - inicio >= duracao:
+                    break
+                
+                if agora >= proxima_leitura_modo:
+                    proxima_leitura_modo = agora + INTERVALO_TESTE_MODO
+                    novo_modo, _ = self.ler_modo_atual()
+                    if novo_modo is not None and novo_modo != modo_atual:
+                        modo_atual = novo_modo
+                        print(f"   🔄 Modo alterado: {modo_atual.upper().replace('_', ' ')}")
+                
+                entradas, saidas_digitais = self.modbus.le_mascaras()
+                if entradas is not None and saidas_digitais is not None:
+                    estado = (entradas, saidas_digitais, modo_atual)
+                    if estado != ultimo_estado:
+                        ultimo_estado = estado
+                        linhas, correspondencias = _resumo_correspondencia(entradas, saidas_digitais)
+                        print(f"   [{agora - inicio:6.2f}s] {' | '.join(linhas)} | 1:1: {correspondencias}/16")
+                
+                espera = INTERVALO_TESTE_IO - (time.monotonic() - agora)
+                if espera > 0:
+                    time.sleep(espera)
+        except KeyboardInterrupt:
+            print("\n   Teste interrompido pelo usuário")
+        
+        print("   ✅ Teste contínuo finalizado")
+    
     def backup_configuracao(self):
         """Faz backup da configuração atual"""
-        import time
-        
         print("\n💾 Fazendo Backup da Configuração...")
         
         modo_atual, modo_valor = self.ler_modo_atual()
@@ -260,7 +314,6 @@ class ConfiguradorLogicaInterna:
             
             filename = f"backup_25iob16_{timestamp}.json"
             try:
-                import json
                 with open(filename, 'w') as f:
                     json.dump(backup, f, indent=2)
                 print(f"   ✅ Backup salvo em: {filename}")
@@ -279,7 +332,6 @@ class ConfiguradorLogicaInterna:
         print(f"\n🔄 Restaurando Configuração de {arquivo_backup}...")
         
         try:
-            import json
             with open(arquivo_backup, 'r') as f:
                 backup = json.load(f)
             
@@ -315,6 +367,79 @@ class ConfiguradorLogicaInterna:
             print(f"   ❌ Erro ao restaurar backup: {e}")
             return False
 
+    def menu_configurar_modo(self):
+        """Menu interativo: escolhe um modo por número ou nome e o configura"""
+        print("\n🔧 CONFIGURAÇÃO DE MODO ESPECÍFICO")
+        print("Modos disponíveis:")
+        for i, modo in enumerate(self.LISTA_MODOS, 1):
+            print(f"   {i}. {modo.replace('_', ' ').title()}")
+        
+        try:
+            escolha = input(f"\nDigite o nome do modo ou número (1-{len(self.LISTA_MODOS)}): ").strip().lower()
+            
+            # Permite escolha por número ou nome
+            if escolha.isdigit():
+                idx = int(escolha) - 1
+                if 0 <= idx < len(self.LISTA_MODOS):
+                    modo_escolhido = self.LISTA_MODOS[idx]
+                else:
+                    print("   ❌ Número inválido!")
+                    return
+            else:
+                # Procura por nome (permite nomes parciais)
+                modo_escolhido = None
+                for modo in self.LISTA_MODOS:
+                    if escolha in modo.lower() or escolha.replace(' ', '_') == modo:
+                        modo_escolhido = modo
+                        break
+                
+                if modo_escolhido is None:
+                    print("   ❌ Modo não encontrado!")
+                    return
+            
+            if self.configurar_modo(modo_escolhido):
+                print(f"\n✅ Modo '{modo_escolhido.replace('_', ' ').title()}' configurado com sucesso!")
+            else:
+                print(f"\n❌ Falha ao configurar modo '{modo_escolhido}'")
+                
+        except ValueError:
+            print("   ❌ Entrada inválida!")
+        except KeyboardInterrupt:
+            print("\n   Operação cancelada pelo usuário")
+    
+    def menu_restaurar_backup(self):
+        """Menu interativo: lista os backups disponíveis e restaura o escolhido"""
+        arquivos_backup = glob.glob("backup_25iob16_*.json")
+        
+        if not arquivos_backup:
+            print("\n❌ Nenhum arquivo de backup encontrado")
+            return
+        
+        print("\n📁 ARQUIVOS DE BACKUP DISPONÍVEIS:")
+        for i, arquivo in enumerate(arquivos_backup, 1):
+            print(f"   {i}. {arquivo}")
+        
+        try:
+            escolha = input("\nEscolha o número do backup ou digite o nome: ").strip()
+            
+            if escolha.isdigit():
+                idx = int(escolha) - 1
+                if 0 <= idx < len(arquivos_backup):
+                    arquivo_escolhido = arquivos_backup[idx]
+                else:
+                    print("   ❌ Número inválido!")
+                    return
+            else:
+                arquivo_escolhido = escolha
+            
+            if self.restaurar_configuracao(arquivo_escolhido):
+                print("\n🔄 Configuração restaurada!")
+        
+        except ValueError:
+            print("   ❌ Entrada inválida!")
+        except KeyboardInterrupt:
+            print("\n   Operação cancelada pelo usuário")
+
 def main():
     """Função principal"""
     # CONFIGURAÇÕES CARREGADAS DO .env
@@ -334,6 +459,38 @@ def main():
         if not configurador.conectar():
             return
         
+        def ativar_mapeamento():
+            if configurador.ativar_mapeamento_1_para_1():
+                print("\n✅ Mapeamento 1:1 ativado com sucesso!")
+                print("   🎯 A placa agora funciona independentemente de software!")
+                print("   📝 Cada entrada controla automaticamente sua saída correspondente")
+            else:
+                print("\n❌ Falha na ativação do mapeamento 1:1")
+        
+        def desativar_logica():
+            if configurador.desativar_logica_interna():
+                print("\n✅ Lógica interna desativada com sucesso!")
+            else:
+                print("\n❌ Falha ao desativar lógica interna")
+        
+        def fazer_backup():
+            arquivo_backup = configurador.backup_configuracao()
+            if arquivo_backup:
+                print(f"\n💾 Backup criado: {arquivo_backup}")
+        
+        # Tabela de despacho do menu: opção → ação
+        acoes = {
+            "1": ativar_mapeamento,
+            "2": configurador.listar_modos_disponiveis,
+            "3": configurador.menu_configurar_modo,
+            "4": configurador.verificar_configuracao_atual,
+            "5": configurador.testar_logica_interna,
+            "6": desativar_logica,
+            "7": fazer_backup,
+            "8": configurador.menu_restaurar_backup,
+            "9": configurador.testar_logica_interna_loop,
+        }
+        
         while True:
             print("\n📋 OPÇÕES DISPONÍVEIS:")
             print("1. Ativar mapeamento 1:1 (Entrada N → Saída N)")
@@ -344,115 +501,19 @@ def main():
             print("6. Desativar lógica interna")
             print("7. Backup da configuração")
             print("8. Restaurar configuração")
+            print("9. Teste contínuo da lógica interna (30s)")
             print("0. Sair")
             
-            opcao = input("\nEscolha uma opção (0-8): ").strip()
-            
-            if opcao == "1":
-                if configurador.ativar_mapeamento_1_para_1():
-                    print("\n✅ Mapeamento 1:1 ativado com sucesso!")
-                    print("   🎯 A placa agora funciona independentemente de software!")
-                    print("   📝 Cada entrada controla automaticamente sua saída correspondente")
-                else:
-                    print("\n❌ Falha na ativação do mapeamento 1:1")
-            
-            elif opcao == "2":
-                configurador.listar_modos_disponiveis()
-            
-            elif opcao == "3":
-                print("\n🔧 CONFIGURAÇÃO DE MODO ESPECÍFICO")
-                print("Modos disponíveis:")
-                for i, modo in enumerate(configurador.MODOS.keys(), 1):
-                    print(f"   {i}. {modo.replace('_', ' ').title()}")
-                
-                try:
-                    escolha = input("\nDigite o nome do modo ou número (1-6): ").strip().lower()
-                    
-                    # Permite escolha por número ou nome
-                    if escolha.isdigit():
-                        idx = int(escolha) - 1
-                        if 0 <= idx < len(configurador.MODOS):
-                            modo_escolhido = list(configurador.MODOS.keys())[idx]
-                        else:
-                            print("   ❌ Número inválido!")
-                            continue
-                    else:
-                        # Procura por nome (permite nomes parciais)
-                        modo_escolhido = None
-                        for modo in configurador.MODOS.keys():
-                            if escolha in modo.lower() or escolha.replace(' ', '_') == modo:
-                                modo_escolhido = modo
-                                break
-                        
-                        if modo_escolhido is None:
-                            print("   ❌ Modo não encontrado!")
-                            continue
-                    
-                    if configurador.configurar_modo(modo_escolhido):
-                        print(f"\n✅ Modo '{modo_escolhido.replace('_', ' ').title()}' configurado com sucesso!")
-                    else:
-                        print(f"\n❌ Falha ao configurar modo '{modo_escolhido}'")
-                        
-                except ValueError:
-                    print("   ❌ Entrada inválida!")
-                except KeyboardInterrupt:
-                    print("\n   Operação cancelada pelo usuário")
-            
-            elif opcao == "4":
-                configurador.verificar_configuracao_atual()
-            
-            elif opcao == "5":
-                configurador.testar_logica_interna()
-            
-            elif opcao == "6":
-                if configurador.desativar_logica_interna():
-                    print("\n✅ Lógica interna desativada com sucesso!")
-                else:
-                    print("\n❌ Falha ao desativar lógica interna")
-            
-            elif opcao == "7":
-                arquivo_backup = configurador.backup_configuracao()
-                if arquivo_backup:
-                    print(f"\n💾 Backup criado: {arquivo_backup}")
-            
-            elif opcao == "8":
-                import glob
-                arquivos_backup = glob.glob("backup_25iob16_*.json")
-                
-                if not arquivos_backup:
-                    print("\n❌ Nenhum arquivo de backup encontrado")
-                else:
-                    print("\n📁 ARQUIVOS DE BACKUP DISPONÍVEIS:")
-                    for i, arquivo in enumerate(arquivos_backup, 1):
-                        print(f"   {i}. {arquivo}")
-                    
-                    try:
-                        escolha = input("\nEscolha o número do backup ou digite o nome: ").strip()
-                        
-                        if escolha.isdigit():
-                            idx = int(escolha) - 1
-                            if 0 <= idx < len(arquivos_backup):
-                                arquivo_escolhido = arquivos_backup[idx]
-                            else:
-                                print("   ❌ Número inválido!")
-                                continue
-                        else:
-                            arquivo_escolhido = escolha
-                        
-                        if configurador.restaurar_configuracao(arquivo_escolhido):
-                            print("\n🔄 Configuração restaurada!")
-                    
-                    except ValueError:
-                        print("   ❌ Entrada inválida!")
-                    except KeyboardInterrupt:
-                        print("\n   Operação cancelada pelo usuário")
+            opcao = input("\nEscolha uma opção (0-9): ").strip()
             
+            acao = acoes.get(opcao)
+            if acao:
+                acao()
             elif opcao == "0":
                 print("\n👋 Saindo...")
                 break
-            
             else:
-                print("\n❌ Opção inválida! Digite um número de 0 a 8.")
+                print("\n❌ Opção inválida! Digite um número de 0 a 9.")
             
             input("\n⏸️  Pressione Enter para continuar...")
         
@@ -5,18 +5,78 @@ Controle do módulo Eletechsup 25IOB16 via Modbus TCP usando pymodbus
 
 from pymodbus.client import ModbusTcpClient
 from pymodbus.exceptions import ModbusException
+import threading
 import time
 import logging
 import os
+import socket
 from dotenv import load_dotenv
 
 # Carrega variáveis de ambiente do arquivo .env
 load_dotenv()
 
+# Keep-alive TCP: detecta queda silenciosa da conexão com o gateway
+# (5 + 2 x 3 = ~11s até o kernel derrubar um socket sem resposta)
+KEEPALIVE_IDLE = 5         # Segundos sem tráfego antes do primeiro probe
+KEEPALIVE_INTERVALO = 2    # Segundos entre probes
+KEEPALIVE_TENTATIVAS = 3   # Probes sem resposta até considerar a conexão morta
+
+def _configura_socket(sock):
+    """Liga TCP_NODELAY (sem atraso de Nagle nos frames pequenos) e keep-alive no socket"""
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    except OSError:
+        return
+    
+    # Parâmetros finos de keep-alive não existem em todas as plataformas
+    for opcao, valor in (('TCP_KEEPIDLE', KEEPALIVE_IDLE),
+                         ('TCP_KEEPINTVL', KEEPALIVE_INTERVALO),
+                         ('TCP_KEEPCNT', KEEPALIVE_TENTATIVAS)):
+        if hasattr(socket, opcao):
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, opcao), valor)
+            except OSError:
+                pass
+
+# Exceções Modbus que repetir a requisição não resolve:
+# 1 = função ilegal, 2 = endereço ilegal, 3 = valor ilegal
+_EXCECOES_DEFINITIVAS = (1, 2, 3)
+
+def _erro_definitivo(result):
+    """Exceções Modbus 1/2/3 não se resolvem com nova tentativa (timeout, CRC e 10/11 seguem com retry)"""
+    return getattr(result, 'exception_code', 0) in _EXCECOES_DEFINITIVAS
+
+def _mascara_para_lista(mascara):
+    """Expande bitmask de 16 bits em lista de 16 valores 0/1 (bit N = porta N+1)"""
+    if mascara is None:
+        return None
+    return [(mascara >> bit) & 1 for bit in range(16)]
+
+class _ModbusTcpClientBaixaLatencia(ModbusTcpClient):
+    """ModbusTcpClient que aplica _configura_socket a cada socket novo (inclusive reconexões)"""
+    def connect(self):
+        socket_anterior = self.socket
+        conectado = super().connect()
+        if conectado and self.socket is not socket_anterior:
+            _configura_socket(self.socket)
+        return conectado
+
+def _agrupar_consecutivos(canais):
+    """Agrupa canais ordenados em sequências contíguas: [1, 2, 3, 7] -> [[1, 2, 3], [7]]"""
+    grupos = []
+    for canal in canais:
+        if grupos and canal == grupos[-1][-1] + 1:
+            grupos[-1].append(canal)
+        else:
+            grupos.append([canal])
+    return grupos
+
 class Modbus25IOB16Pymodbus:
     # Client compartilhado entre todas as instâncias (best practice pymodbus)
     _shared_client = None
     _shared_client_config = None
+    _lock_client = threading.Lock()  # Guarda a troca do client compartilhado entre threads
     
     # Configurações de retry e timing otimizadas para Eletechsup 25IOB16
     DEFAULT_RETRY_COUNT = 3
@@ -24,6 +84,16 @@ class Modbus25IOB16Pymodbus:
     DEFAULT_BACKOFF_MULTIPLIER = 2.0
     MAX_RETRY_DELAY = 5.0
     
+    # Limite do protocolo: FC03 lê no máximo 125 registradores por requisição
+    MAX_REGISTRADORES_LEITURA = 125
+    
+    # Comandos escritos nos registradores de saída (0-15)
+    CMD_LIGA = 0x0100          # 256
+    CMD_DESLIGA = 0x0200       # 512
+    CMD_TOGGLE = 0x0300        # 768
+    CMD_LIGA_TUDO = 0x0700     # 1792 (no reg 0)
+    CMD_DESLIGA_TUDO = 0x0800  # 2048 (no reg 0)
+    
     def __init__(self, host, port=502, unit_id=1, timeout=12):
         self.host = host
         self.port = port
@@ -34,6 +104,7 @@ class Modbus25IOB16Pymodbus:
         self.retry_count = self.DEFAULT_RETRY_COUNT
         self.retry_delay = self.DEFAULT_RETRY_DELAY
         self.backoff_multiplier = self.DEFAULT_BACKOFF_MULTIPLIER
+        self.fc16_suportado = True  # Vira False se o módulo recusar escrita múltipla (FC16)
         
         # Logs para diagnóstico
         self.logger = logging.getLogger(f'Modbus25IOB16_{unit_id}')
@@ -61,25 +132,31 @@ class Modbus25IOB16Pymodbus:
         
         for attempt in range(self.retry_count + 1):
             try:
-                # Se já existe um client compartilhado conectado, usa ele
-                if (Modbus25IOB16Pymodbus._shared_client is not None and 
-                    Modbus25IOB16Pymodbus._shared_client.connected):
-                    self.client = Modbus25IOB16Pymodbus._shared_client
-                    return True
-                    
-                # Cria nova conexão compartilhada
-                if Modbus25IOB16Pymodbus._shared_client:
-                    Modbus25IOB16Pymodbus._shared_client.close()
+                # Verificar, fechar e substituir o client é uma operação só: sem o lock, duas
+                # threads reconectando ao mesmo tempo fechariam o socket uma da outra
+                with Modbus25IOB16Pymodbus._lock_client:
+                    # Se já existe um client compartilhado conectado, usa ele
+                    if (Modbus25IOB16Pymodbus._shared_client is not None and 
+                        Modbus25IOB16Pymodbus._shared_client.connected):
+                        self.client = Modbus25IOB16Pymodbus._shared_client
+                        return True
+                        
+                    # Cria nova conexão compartilhada
+                    if Modbus25IOB16Pymodbus._shared_client:
+                        Modbus25IOB16Pymodbus._shared_client.close()
+                        
+                    # Configurações otimizadas para Eletechsup 25IOB16
+                    Modbus25IOB16Pymodbus._shared_client = _ModbusTcpClientBaixaLatencia(
+                        self.host, 
+                        port=self.port, 
+                        timeout=self.timeout
+                    )
                     
-                # Configurações otimizadas para Eletechsup 25IOB16
-                Modbus25IOB16Pymodbus._shared_client = ModbusTcpClient(
-                    self.host, 
-                    port=self.port, 
-                    timeout=self.timeout
-                )
+                    conectado = Modbus25IOB16Pymodbus._shared_client.connect()
+                    if conectado:
+                        self.client = Modbus25IOB16Pymodbus._shared_client
                 
-                if Modbus25IOB16Pymodbus._shared_client.connect():
-                    self.client = Modbus25IOB16Pymodbus._shared_client
+                if conectado:
                     self.logger.info(f"Conexão estabelecida com {self.host}:{self.port} (tentativa {attempt + 1})")
                     return True
                 else:
@@ -105,8 +182,9 @@ class Modbus25IOB16Pymodbus:
     
     def disconnect(self):
         """Fecha conexão"""
-        if self.client:
-            self.client.close()
+        with Modbus25IOB16Pymodbus._lock_client:
+            if self.client:
+                self.client.close()
     
     def _write_register(self, register, value):
         """Escreve valor em registrador usando Function Code 06 com retry automático"""
@@ -116,12 +194,12 @@ class Modbus25IOB16Pymodbus:
                     continue
             
             try:
-                start_time = time.time()
+                start_time = time.monotonic()
                 result = self.client.write_register(register, value, device_id=self.unit_id)
-                elapsed_time = time.time() - start_time
+                elapsed_time = time.monotonic() - start_time
                 
                 if result.isError():
-                    if attempt < self.retry_count:
+                    if attempt < self.retry_count and not _erro_definitivo(result):
                         delay = min(self.retry_delay * (self.backoff_multiplier ** attempt), self.MAX_RETRY_DELAY)
                         self.logger.warning(f"Erro na escrita unit_id {self.unit_id} reg {register}: {result}. Tentativa {attempt + 1}/{self.retry_count + 1}. Aguardando {delay:.1f}s...")
                         time.sleep(delay)
@@ -151,13 +229,62 @@ class Modbus25IOB16Pymodbus:
         
         return False
     
+    def _write_registers(self, register, values):
+        """Escreve valores em registradores consecutivos usando Function Code 16 com retry automático"""
+        for attempt in range(self.retry_count + 1):
+            if not self.client or not self.client.connected:
+                if not self.connect():
+                    continue
+            
+            try:
+                start_time = time.monotonic()
+                result = self.client.write_registers(register, values, device_id=self.unit_id)
+                elapsed_time = time.monotonic() - start_time
+                
+                if result.isError():
+                    if attempt < self.retry_count and not _erro_definitivo(result):
+                        delay = min(self.retry_delay * (self.backoff_multiplier ** attempt), self.MAX_RETRY_DELAY)
+                        self.logger.warning(f"Erro na escrita múltipla unit_id {self.unit_id} reg {register}-{register + len(values) - 1}: {result}. Tentativa {attempt + 1}/{self.retry_count + 1}. Aguardando {delay:.1f}s...")
+                        time.sleep(delay)
+                        continue
+                    else:
+                        if _erro_definitivo(result):
+                            self.fc16_suportado = False
+                        self.logger.error(f"Erro definitivo na escrita múltipla unit_id {self.unit_id} reg {register}-{register + len(values) - 1}: {result}")
+                        print(f"Erro na escrita múltipla para unit_id {self.unit_id}: {result}")
+                        self.failed_reads += 1
+                        return False
+                
+                self.successful_reads += 1
+                self.last_successful_read = time.time()
+                self.logger.debug(f"Escrita múltipla bem-sucedida unit_id {self.unit_id} reg {register}-{register + len(values) - 1} ({elapsed_time:.3f}s)")
+                return True
+                
+            except Exception as e:
+                if attempt < self.retry_count:
+                    delay = min(self.retry_delay * (self.backoff_multiplier ** attempt), self.MAX_RETRY_DELAY)
+                    self.logger.warning(f"Erro na comunicação unit_id {self.unit_id}: {e}. Tentativa {attempt + 1}/{self.retry_count + 1}. Aguardando {delay:.1f}s...")
+                    time.sleep(delay)
+                    continue
+                else:
+                    self.logger.error(f"Erro definitivo na comunicação unit_id {self.unit_id}: {e}")
+                    print(f"Erro na comunicação unit_id {self.unit_id}: {e}")
+                    self.failed_reads += 1
+                    return False
+        
+        return False
+    
+    def escreve_registrador(self, register, value):
+        """Escreve um valor num registrador qualquer (FC06), com reconexão e retry automáticos"""
+        return self._write_register(register, value)
+    
     def liga_tudo(self):
         """Liga todas as saídas (reg 0 = 1792 = 0x0700)"""
-        return self._write_register(0, 1792)
+        return self._write_register(0, self.CMD_LIGA_TUDO)
     
     def desliga_tudo(self):
         """Desliga todas as saídas (reg 0 = 2048 = 0x0800)"""
-        return self._write_register(0, 2048)
+        return self._write_register(0, self.CMD_DESLIGA_TUDO)
     
     def toggle_canal(self, canal):
         """Toggle do canal específico (1-16)"""
@@ -165,7 +292,32 @@ class Modbus25IOB16Pymodbus:
             raise ValueError("Canal deve estar entre 1 e 16")
         
         register = canal - 1  # Canal 1 = reg 0, canal 2 = reg 1, etc.
-        return self._write_register(register, 768)  # 0x0300
+        return self._write_register(register, self.CMD_TOGGLE)
+    
+    def toggle_canais(self, canais):
+        """Toggle de vários canais (1-16) - retorna a lista dos canais alternados com sucesso"""
+        canais = sorted(set(canais))
+        for canal in canais:
+            if not (1 <= canal <= 16):
+                raise ValueError("Canal deve estar entre 1 e 16")
+        
+        alternados = []
+        for grupo in _agrupar_consecutivos(canais):
+            # Consecutivos numa única escrita FC16 (0x0300 em cada registrador);
+            # se o módulo recusar o FC16, cai para FC06 canal a canal
+            if len(grupo) > 1 and self.fc16_suportado:
+                if self._write_registers(grupo[0] - 1, [self.CMD_TOGGLE] * len(grupo)):
+                    alternados.extend(grupo)
+                    continue
+                if self.fc16_suportado:
+                    # Falha de comunicação: o toggle pode ter sido aplicado, não repete
+                    continue
+                self.logger.warning(f"FC16 recusado unit_id {self.unit_id} - alternando canais um a um (FC06)")
+            
+            for canal in grupo:
+                if self._write_register(canal - 1, self.CMD_TOGGLE):
+                    alternados.append(canal)
+        return alternados
     
     def liga_canal(self, canal):
         """Liga canal específico (1-16)"""
@@ -173,7 +325,7 @@ class Modbus25IOB16Pymodbus:
             raise ValueError("Canal deve estar entre 1 e 16")
         
         register = canal - 1
-        return self._write_register(register, 256)  # 0x0100
+        return self._write_register(register, self.CMD_LIGA)
     
     def desliga_canal(self, canal):
         """Desliga canal específico (1-16)"""
@@ -181,37 +333,33 @@ class Modbus25IOB16Pymodbus:
             raise ValueError("Canal deve estar entre 1 e 16")
         
         register = canal - 1
-        return self._write_register(register, 512)  # 0x0200
+        return self._write_register(register, self.CMD_DESLIGA)
     
     def le_status_entradas(self):
-        """Lê status das entradas digitais (registrador 192) com retry automático"""
+        """Lê status das entradas digitais (registrador 192) como lista de 16 valores 0/1"""
+        return _mascara_para_lista(self.le_mascara_entradas())
+    
+    def le_mascara_entradas(self):
+        """Lê entradas digitais (registrador 192) como bitmask de 16 bits (bit N = entrada N+1) com retry automático"""
         for attempt in range(self.retry_count + 1):
             if not self.client or not self.client.connected:
                 if not self.connect():
                     continue
             
             try:
-                start_time = time.time()
+                start_time = time.monotonic()
                 result_192 = self.client.read_holding_registers(192, count=1, device_id=self.unit_id)
-                elapsed_time = time.time() - start_time
+                elapsed_time = time.monotonic() - start_time
                 
                 if not result_192.isError():
-                    valor_192 = result_192.registers[0]
-                    
-                    # Constrói a lista de 16 entradas
-                    entradas = [0] * 16
-                    
-                    # Processa todos os 16 bits do registrador 192
-                    for bit in range(16):
-                        if valor_192 & (1 << bit):
-                            entradas[bit] = 1  # bit N = entrada N+1
+                    valor_192 = result_192.registers[0] & 0xFFFF
                     
                     self.successful_reads += 1
                     self.last_successful_read = time.time()
                     self.logger.debug(f"Leitura entradas unit_id {self.unit_id} bem-sucedida ({elapsed_time:.3f}s)")
-                    return entradas
+                    return valor_192
                 else:
-                    if attempt < self.retry_count:
+                    if attempt < self.retry_count and not _erro_definitivo(result_192):
                         delay = min(self.retry_delay * (self.backoff_multiplier ** attempt), self.MAX_RETRY_DELAY)
                         self.logger.warning(f"Erro ao ler entradas unit_id {self.unit_id}: {result_192}. Tentativa {attempt + 1}/{self.retry_count + 1}. Aguardando {delay:.1f}s...")
                         time.sleep(delay)
@@ -267,10 +415,10 @@ class Modbus25IOB16Pymodbus:
                     continue
             
             try:
-                start_time = time.time()
+                start_time = time.monotonic()
                 # Lê apenas 1 registrador específico
                 result = self.client.read_holding_registers(register, count=1, device_id=self.unit_id)
-                elapsed_time = time.time() - start_time
+                elapsed_time = time.monotonic() - start_time
                 
                 if not result.isError():
                     valor = result.registers[0]
@@ -281,7 +429,7 @@ class Modbus25IOB16Pymodbus:
                     self.logger.debug(f"Leitura saída {canal} unit_id {self.unit_id} bem-sucedida ({elapsed_time:.3f}s): {status}")
                     return status
                 else:
-                    if attempt < self.retry_count:
+                    if attempt < self.retry_count and not _erro_definitivo(result):
                         delay = min(self.retry_delay * (self.backoff_multiplier ** attempt), self.MAX_RETRY_DELAY)
                         self.logger.warning(f"Erro ao ler saída {canal} unit_id {self.unit_id}: {result}. Tentativa {attempt + 1}/{self.retry_count + 1}. Aguardando {delay:.1f}s...")
                         time.sleep(delay)
@@ -307,35 +455,37 @@ class Modbus25IOB16Pymodbus:
         return None
 
     def le_status_saidas_digitais(self):
-        """Lê status das saídas como lista de 0/1 (16 saídas) com retry automático"""
+        """Lê status das saídas como lista de 0/1 (16 saídas)"""
+        return _mascara_para_lista(self.le_mascara_saidas())
+    
+    def le_mascara_saidas(self):
+        """Lê saídas (registradores 0-15) como bitmask de 16 bits (bit N = saída N+1) com retry automático"""
         for attempt in range(self.retry_count + 1):
             if not self.client or not self.client.connected:
                 if not self.connect():
                     continue
             
             try:
-                start_time = time.time()
+                start_time = time.monotonic()
                 # Lê 16 registradores a partir do 0 (saídas)
                 result = self.client.read_holding_registers(0, count=16, device_id=self.unit_id)
-                elapsed_time = time.time() - start_time
+                elapsed_time = time.monotonic() - start_time
                 
                 if not result.isError():
-                    registradores = result.registers
-                    saidas = [0] * 16
-                    
                     # Converte registradores para status digital
                     # Cada registrador representa uma saída
                     # Valores típicos: 0 = OFF, >0 = ON
-                    for i, valor in enumerate(registradores):
-                        if i < 16:  # Apenas as primeiras 16 saídas
-                            saidas[i] = 1 if valor > 0 else 0
+                    saidas = 0
+                    for i, valor in enumerate(result.registers[:16]):
+                        if valor > 0:
+                            saidas |= 1 << i
                     
                     self.successful_reads += 1
                     self.last_successful_read = time.time()
                     self.logger.debug(f"Leitura saídas unit_id {self.unit_id} bem-sucedida ({elapsed_time:.3f}s)")
                     return saidas
                 else:
-                    if attempt < self.retry_count:
+                    if attempt < self.retry_count and not _erro_definitivo(result):
                         delay = min(self.retry_delay * (self.backoff_multiplier ** attempt), self.MAX_RETRY_DELAY)
                         self.logger.warning(f"Erro ao ler saídas unit_id {self.unit_id}: {result}. Tentativa {attempt + 1}/{self.retry_count + 1}. Aguardando {delay:.1f}s...")
                         time.sleep(delay)
@@ -360,6 +510,69 @@ class Modbus25IOB16Pymodbus:
         
         return None
     
+    def le_mascaras(self):
+        """Lê entradas (reg 192) e saídas (regs 0-15) como bitmasks - retorna (entradas, saidas)"""
+        # 0-192 numa só leitura seriam 193 registradores, acima do limite de 125 do FC03.
+        # Se as entradas falharem o módulo não está respondendo: não insiste nas saídas
+        entradas = self.le_mascara_entradas()
+        if entradas is None:
+            return None, None
+        return entradas, self.le_mascara_saidas()
+
+    def le_registradores(self, inicio, quantidade):
+        """Lê uma faixa qualquer de holding registers em blocos de até 125 - retorna lista ou None"""
+        valores = []
+        for bloco in range(inicio, inicio + quantidade, self.MAX_REGISTRADORES_LEITURA):
+            tamanho = min(self.MAX_REGISTRADORES_LEITURA, inicio + quantidade - bloco)
+            registradores = self._read_registers(bloco, tamanho)
+            if registradores is None:
+                return None
+            valores.extend(registradores)
+        return valores
+    
+    def _read_registers(self, register, count):
+        """Lê registradores consecutivos usando Function Code 03 com retry automático"""
+        for attempt in range(self.retry_count + 1):
+            if not self.client or not self.client.connected:
+                if not self.connect():
+                    continue
+            
+            try:
+                start_time = time.monotonic()
+                result = self.client.read_holding_registers(register, count=count, device_id=self.unit_id)
+                elapsed_time = time.monotonic() - start_time
+                
+                if not result.isError():
+                    self.successful_reads += 1
+                    self.last_successful_read = time.time()
+                    self.logger.debug(f"Leitura reg {register}-{register + count - 1} unit_id {self.unit_id} bem-sucedida ({elapsed_time:.3f}s)")
+                    return result.registers[:count]
+                else:
+                    if attempt < self.retry_count and not _erro_definitivo(result):
+                        delay = min(self.retry_delay * (self.backoff_multiplier ** attempt), self.MAX_RETRY_DELAY)
+                        self.logger.warning(f"Erro ao ler reg {register}-{register + count - 1} unit_id {self.unit_id}: {result}. Tentativa {attempt + 1}/{self.retry_count + 1}. Aguardando {delay:.1f}s...")
+                        time.sleep(delay)
+                        continue
+                    else:
+                        self.logger.error(f"Erro definitivo ao ler reg {register}-{register + count - 1} unit_id {self.unit_id}: {result}")
+                        print(f"Erro ao ler registradores {register}-{register + count - 1} unit_id {self.unit_id}: {result}")
+                        self.failed_reads += 1
+                        return None
+                        
+            except Exception as e:
+                if attempt < self.retry_count:
+                    delay = min(self.retry_delay * (self.backoff_multiplier ** attempt), self.MAX_RETRY_DELAY)
+                    self.logger.warning(f"Erro na leitura reg {register} unit_id {self.unit_id}: {e}. Tentativa {attempt + 1}/{self.retry_count + 1}. Aguardando {delay:.1f}s...")
+                    time.sleep(delay)
+                    continue
+                else:
+                    self.logger.error(f"Erro definitivo na leitura reg {register} unit_id {self.unit_id}: {e}")
+                    print(f"Erro na leitura reg {register} unit_id {self.unit_id}: {e}")
+                    self.failed_reads += 1
+                    return None
+        
+        return None
+    
     def get_performance_stats(self):
         """Retorna estatísticas de performance da conexão"""
         success_rate = 0
@@ -383,8 +596,16 @@ class Modbus25IOB16Pymodbus:
         handler.setFormatter(formatter)
         self.logger.addHandler(handler)
         
-    def set_custom_timing(self, retry_count=None, retry_delay=None, backoff_multiplier=None):
-        """Permite configurar tempos customizados por dispositivo"""
+    def set_custom_timing(self, retry_count=None, retry_delay=None, backoff_multiplier=None, timeout=None):
+        """Permite configurar tempos customizados por dispositivo (o timeout vale para o client compartilhado)"""
+        if timeout is not None:
+            self.timeout = timeout
+            if self.client is not None:
+                self.client.comm_params.timeout_connect = timeout
+            # Instância que ainda não vinculou o client (módulos 2+) aplica no compartilhado do gateway
+            if (Modbus25IOB16Pymodbus._shared_client is not None and
+                    Modbus25IOB16Pymodbus._shared_client_config == (self.host, self.port)):
+                Modbus25IOB16Pymodbus._shared_client.comm_params.timeout_connect = timeout
         if retry_count is not None:
             self.retry_count = retry_count
         if retry_delay is not None:
@@ -433,9 +654,9 @@ if __name__ == "__main__":
     try:
         # Teste prioritário: leitura das entradas (interruptores de luz - crítico)
         print("\n🔍 TESTE CRÍTICO - Lendo status das entradas (interruptores)...")
-        start_time = time.time()
+        start_time = time.monotonic()
         entradas = modbus.le_status_entradas()
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
         
         if entradas:
             entradas_ativas = [i+1 for i, x in enumerate(entradas) if x]
@@ -445,9 +666,9 @@ if __name__ == "__main__":
         
         # Teste secundário: leitura das saídas (menos crítico)
         print("\n🔧 TESTE SECUNDÁRIO - Lendo status das saídas...")
-        start_time = time.time()
+        start_time = time.monotonic()
         saidas = modbus.le_status_saidas_digitais()
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
         
         if saidas:
             saidas_ativas = [i+1 for i, x in enumerate(saidas) if x]
@@ -457,9 +678,9 @@ if __name__ == "__main__":
         
         # Teste de escrita conservador
         print("\n⚡ TESTE DE ESCRITA - Liga canal 1...")
-        start_time = time.time()
+        start_time = time.monotonic()
         if modbus.liga_canal(1):
-            elapsed = time.time() - start_time
+            elapsed = time.monotonic() - start_time
             print(f"✅ Comando executado em {elapsed:.3f}s")
             
             # Aguarda tempo adequado antes da próxima operação
@@ -474,7 +695,7 @@ if __name__ == "__main__":
             else:
                 print("⚠️ Canal 1 pode não ter sido ligado corretamente")
         else:
-            elapsed = time.time() - start_time
+            elapsed = time.monotonic() - start_time
             print(f"❌ Falha no comando após {elapsed:.3f}s")
     
     finally:
@@ -16,10 +16,13 @@ COMANDOS PRINCIPAIS:
 """
 
 from modbus_25iob16_pymodbus import Modbus25IOB16Pymodbus
+import re
 import time
 import signal
 import threading
-import queue
+import logging
+from collections import deque
+from functools import lru_cache
 from datetime import datetime
 import os
 from dotenv import load_dotenv
@@ -27,12 +30,68 @@ from dotenv import load_dotenv
 # Carrega variáveis de ambiente do arquivo .env
 load_dotenv()
 
+# Log de diagnóstico do ciclo de leitura (silencioso por padrão)
+logger = logging.getLogger(__name__)
+
 # Configurações globais
 INTERVALO_LEITURA = 0.5          # 500ms para leitura automática das entradas
+INTERVALO_LEITURA_MIN = 0.1      # 100ms logo após mudanças nas entradas (polling adaptativo)
+INTERVALO_LEITURA_MAX = 2.0      # Teto da leitura automática com as entradas em repouso
+AMOSTRAS_MIN_ADAPTATIVO = 32     # Mudanças observadas antes de usar a mediana entre mudanças
+CICLOS_REPOUSO = 20              # Leituras sem mudança a cada degrau (dobra) do intervalo
 INTERVALO_POLLING_IN1 = 0.2      # 200ms para polling específico do módulo 1
+INTERVALO_POLLING_IN1_MIN = 0.05 # 50ms logo após uma mudança nas entradas do M1
+INTERVALO_POLLING_IN1_MAX = 0.5  # Teto do polling do M1 com as entradas em repouso
 POLLING_IN1_ATIVO = True         # Ativa polling específico para entradas M1
 MAX_TENTATIVAS = 3               # Tentativas de retry para operações Modbus
 TIMEOUT_COMANDOS = 8.0           # Timeout para threads
+BACKOFF_MIN = 0.5                # Espera inicial após falha de leitura de um módulo (s)
+BACKOFF_MAX = 10.0               # Espera máxima entre tentativas em módulo com falha (s)
+TIMEOUT_MODBUS = 15              # Timeout Modbus em operação normal (s)
+TENTATIVAS_MODBUS = 2            # Retries Modbus em operação normal
+TIMEOUT_DETECCAO = 0.5           # Timeout curto na conexão inicial (módulo vivo responde em <50ms)
+TENTATIVAS_DETECCAO = 1          # Retries na conexão inicial
+
+# Padrões de comando compilados uma única vez
+_RE_COMANDO_MODULO = re.compile(r'^([a-z_]+)(\d+)$')            # out1, in2
+_RE_COMANDO_PORTA = re.compile(r'^([a-z_]+)(\d*)\.(\d+)$')     # on2.3, all_on.2
+
+# Texto estático da ajuda, montado uma vez na importação
+_AJUDA = "\n".join([
+    "\n📋 COMANDOS DISPONÍVEIS:",
+    "┌─────────────────────────────────────────────────────┐",
+    "│ CONTROLE DE SAÍDAS:                                 │",
+    "│   1.5         : Toggle saída 5 do módulo 1         │",
+    "│   on2.3       : Ligar saída 3 do módulo 2          │",
+    "│   off1.12     : Desligar saída 12 do módulo 1      │",
+    "│   all_on.2    : Ligar todas saídas do módulo 2     │",
+    "│   all_off.1   : Desligar todas saídas do módulo 1  │",
+    "├─────────────────────────────────────────────────────┤",
+    "│ LEITURA:                                            │",
+    "│   out1        : Ler todas saídas do módulo 1       │",
+    "│   out1.5      : Ler saída 5 do módulo 1            │",
+    "│   in1         : Ler entradas do módulo 1           │",
+    "├─────────────────────────────────────────────────────┤",
+    "│ CONFIGURAÇÃO:                                       │",
+    "│   t1.3        : Toggle entrada 3 do módulo 1       │",
+    "├─────────────────────────────────────────────────────┤",
+    "│ INFORMAÇÕES:                                        │",
+    "│   status      : Status de todos módulos            │",
+    "│   stats       : Estatísticas de performance        │",
+    "│   help        : Esta ajuda                         │",
+    "│   quit        : Sair                               │",
+    "└─────────────────────────────────────────────────────┘",
+])
+
+def _portas_ativas(mascara):
+    """Lista as portas ativas (1-16) de um bitmask de 16 bits"""
+    return [i + 1 for i in range(16) if (mascara >> i) & 1]
+
+@lru_cache(maxsize=1024)
+def _texto_portas(mascara, vazio='Nenhuma'):
+    """Texto de exibição das portas ativas de um bitmask (memorizado por máscara, até 1024 padrões)"""
+    portas = _portas_ativas(mascara)
+    return str(portas) if portas else vazio
 
 class MonitorMultiModulo:
     def __init__(self):
@@ -45,23 +104,63 @@ class MonitorMultiModulo:
         self.modo_operacao = "ÚNICO" if len(self.configuracoes_modulos) == 1 else "MULTI-MÓDULO"
 
         self.modulos_enderecos = list(self.configuracoes_modulos.keys())
+        
+        # Configuração achatada por módulo (consultada a cada ciclo/comando)
+        self.max_portas = {m: c['max_portas'] for m, c in self.configuracoes_modulos.items()}
+        self.tem_entradas = {m: c['tem_entradas'] for m, c in self.configuracoes_modulos.items()}
+        self.mascara_saidas = {m: (1 << n) - 1 for m, n in self.max_portas.items()}
         self.modulos = {}
         self.executando = True
+        self.evento_parada = threading.Event()  # Acorda quem espera assim que o monitor encerra
         
-        # Estados atuais das I/O
+        # Estados atuais das I/O (bitmasks de 16 bits: bit N = porta N+1)
         self.estados_entradas = {}
         self.estados_saidas = {}
         self.toggle_habilitado = {}
-        self.estado_polling_in1 = [0] * 16  # Estado para polling específico M1
+        self.estado_polling_in1 = 0  # Estado para polling específico M1
+        
+        # Polling adaptativo das entradas (leitura geral e polling do M1)
+        self.proximo_poll_entradas = {modulo: 0.0 for modulo in self.modulos_enderecos}
+        self.ultima_mudanca_entradas = {modulo: None for modulo in self.modulos_enderecos}
+        self.intervalos_mudancas = {modulo: deque(maxlen=256) for modulo in self.modulos_enderecos}
+        self.ciclos_sem_mudanca = {modulo: 0 for modulo in self.modulos_enderecos}
+        # (mínimo, base, teto) do intervalo; M1 usa os limites do polling dedicado
+        self.limites_intervalo = {modulo: (INTERVALO_LEITURA_MIN, INTERVALO_LEITURA, INTERVALO_LEITURA_MAX)
+                                  for modulo in self.modulos_enderecos}
+        self.limites_intervalo[1] = (INTERVALO_POLLING_IN1_MIN, INTERVALO_POLLING_IN1, INTERVALO_POLLING_IN1_MAX)
+        self.backoff_modulos = {modulo: 0.0 for modulo in self.modulos_enderecos}
         
         # Contadores e estatísticas
         self.contadores = {modulo: {'leituras': 0, 'comandos': 0, 'toggles': 0} 
                           for modulo in self.modulos_enderecos}
-        self.tempo_inicio = time.time()
+        self.tempo_inicio = time.monotonic()
+        self.ciclos_atrasados = 0  # Ciclos de polling que perderam um período inteiro
         
         # Threads e controles
         self.threads = {}
-        self.locks = {'estados': threading.Lock(), 'modulos': threading.Lock()}
+        # Guarda só os dicionários de estado e contadores; a I/O Modbus acontece fora dele
+        # (a troca do client compartilhado é serializada no driver, em _lock_client)
+        self.lock = threading.RLock()
+        
+        # Tabelas de despacho dos comandos (montadas uma vez, consultadas por hash)
+        self._comandos_globais = {
+            'status': self.mostrar_status,
+            'help': self.mostrar_ajuda,
+            'stats': self.mostrar_estatisticas,
+            'quit': self._encerrar,
+            'exit': self._encerrar,
+            'q': self._encerrar,
+        }
+        self._comandos_modulo = {
+            '': self._cmd_toggle,
+            'on': self._cmd_on,
+            'off': self._cmd_off,
+            'all_on': self._cmd_all_on,
+            'all_off': self._cmd_all_off,
+            'in': self._cmd_in,
+            'out': self._cmd_out,
+            't': self._cmd_toggle_config,
+        }
         
         # Handler para Ctrl+C
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -102,27 +201,39 @@ class MonitorMultiModulo:
     def signal_handler(self, sig, frame):
         """Encerra threads ao receber Ctrl+C"""
         print("\n🛑 Encerrando monitor...")
+        # Só sinaliza: as threads são aguardadas por _aguardar_threads() fora do handler
+        self._encerrar()
+
+    def _encerrar(self):
+        """Sinaliza o encerramento ao loop principal e às threads"""
         self.executando = False
-        for thread in self.threads.values():
-            if thread and thread.is_alive():
+        self.evento_parada.set()
+
+    def _aguardar_threads(self):
+        """Aguarda as threads de leitura terminarem o ciclo atual antes de fechar a conexão"""
+        # A de comandos fica bloqueada em input() e é daemon: esperar por ela travaria o encerramento
+        for nome, thread in self.threads.items():
+            if nome != 'comandos' and thread and thread.is_alive():
                 thread.join(timeout=TIMEOUT_COMANDOS)
 
     def _inicializar_modulos(self):
         """Inicializa conexões e estados dos módulos configurados"""
-        print(f"🔌 Inicializando módulos: {self.modulos_enderecos}")
+        linhas = [f"🔌 Inicializando módulos: {self.modulos_enderecos}"]
         
         for unit_id in self.modulos_enderecos:
             # Cria conexão Modbus
-            modulo = Modbus25IOB16Pymodbus(self.gateway_ip, self.gateway_porta, unit_id, timeout=15)
-            modulo.set_custom_timing(retry_count=2, retry_delay=1.0, backoff_multiplier=1.5)
+            modulo = Modbus25IOB16Pymodbus(self.gateway_ip, self.gateway_porta, unit_id, timeout=TIMEOUT_MODBUS)
+            modulo.set_custom_timing(retry_count=TENTATIVAS_MODBUS, retry_delay=1.0, backoff_multiplier=1.5)
             self.modulos[unit_id] = modulo
             
             # Inicializa estados
-            self.estados_entradas[unit_id] = [0] * 16
-            self.estados_saidas[unit_id] = [0] * 16
-            self.toggle_habilitado[unit_id] = [False] * 16
+            self.estados_entradas[unit_id] = 0
+            self.estados_saidas[unit_id] = 0
+            self.toggle_habilitado[unit_id] = 0
             
-            print(f"   ✅ M{unit_id} configurado")
+            linhas.append(f"   ✅ M{unit_id} configurado")
+        
+        print("\n".join(linhas))
 
     def conectar_todos(self):
         """Conecta aos módulos e faz leitura inicial do estado das portas"""
@@ -130,13 +241,23 @@ class MonitorMultiModulo:
         
         conectados = []
         for unit_id in self.modulos_enderecos:
+            modulo = self.modulos[unit_id]
             print(f"   • M{unit_id}...", end=" ")
-            if self.modulos[unit_id].connect():
-                print("✅")
-                conectados.append(unit_id)
-                self._ler_estado_inicial(unit_id)
-            else:
-                print("❌")
+            
+            # Detecção com timing curto: módulo ausente não segura a partida por 15s × retries
+            modulo.set_custom_timing(retry_count=TENTATIVAS_DETECCAO, retry_delay=0.1,
+                                     backoff_multiplier=1.0, timeout=TIMEOUT_DETECCAO)
+            try:
+                if modulo.connect():
+                    print("✅")
+                    conectados.append(unit_id)
+                    self._ler_estado_inicial(unit_id)
+                else:
+                    print("❌")
+            finally:
+                # Módulo confirmado (ou não): volta ao timing de produção
+                modulo.set_custom_timing(retry_count=TENTATIVAS_MODBUS, retry_delay=1.0,
+                                         backoff_multiplier=1.5, timeout=TIMEOUT_MODBUS)
         
         if conectados:
             print(f"✅ Conectados: {conectados}")
@@ -147,38 +268,35 @@ class MonitorMultiModulo:
 
     def _ler_estado_inicial(self, unit_id):
         """Lê estado inicial de todas as portas do módulo"""
-        config = self.configuracoes_modulos[unit_id]
-
         try:
-            # Lê entradas se o módulo as possui
-            if config['tem_entradas']:
-                entradas = self.modulos[unit_id].le_status_entradas()
-                if entradas:
-                    self.estados_entradas[unit_id] = entradas
-                    entradas_ativas = [i+1 for i, x in enumerate(entradas) if x]
-                    print(f"      📥 Entradas: {entradas_ativas if entradas_ativas else 'Nenhuma'}")
-                else:
-                    print(f"      ⚠️  Timeout ao ler entradas")
-
-            # Lê saídas
-            saidas = self.modulos[unit_id].le_status_saidas_digitais()
-            if saidas:
-                self.estados_saidas[unit_id] = saidas[:config['max_portas']]
-                saidas_ativas = [i+1 for i, x in enumerate(saidas[:config['max_portas']]) if x]
-                print(f"      📤 Saídas: {saidas_ativas if saidas_ativas else 'Nenhuma'}")
+            # Lê entradas e saídas juntas se o módulo possui entradas
+            if self.tem_entradas[unit_id]:
+                entradas, saidas = self.modulos[unit_id].le_mascaras()
+                if entradas is None:
+                    # le_mascaras não chega a ler as saídas quando as entradas falham
+                    print(f"      ⚠️  Módulo não respondeu")
+                    return
+                self.estados_entradas[unit_id] = entradas
+                print(f"      📥 Entradas: {_texto_portas(entradas)}")
+            else:
+                saidas = self.modulos[unit_id].le_mascara_saidas()
+
+            if saidas is not None:
+                self.estados_saidas[unit_id] = saidas & self.mascara_saidas[unit_id]
+                print(f"      📤 Saídas: {_texto_portas(self.estados_saidas[unit_id])}")
             else:
                 print(f"      ⚠️  Timeout ao ler saídas")
 
         except Exception as e:
             print(f"      ❌ Erro ao ler estado inicial: {e}")
 
-    def parsear_comando(self, comando):
-        """Converte comando em (prefixo, modulo, porta)"""
-        import re
-        
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def parsear_comando(comando):
+        """Converte comando em (prefixo, modulo, porta) - memorizado, pois não depende do estado do monitor"""
         # Comandos sem ponto: out1, in1, in2
         if "." not in comando:
-            match = re.match(r'^([a-z_]+)(\d+)$', comando)
+            match = _RE_COMANDO_MODULO.match(comando)
             if match:
                 prefixo, modulo_str = match.groups()
                 if prefixo in ['out', 'in']:
@@ -194,7 +312,7 @@ class MonitorMultiModulo:
                 return "", int(parte1), int(parte2)
             
             # Comando com prefixo
-            match = re.match(r'^([a-z_]+)(\d*)\.(\d+)$', comando)
+            match = _RE_COMANDO_PORTA.match(comando)
             if match:
                 prefixo, modulo_str, porta_str = match.groups()
                 
@@ -214,21 +332,12 @@ class MonitorMultiModulo:
         
         # Comandos globais
         if cmd_base is None:
-            if comando == 'status':
-                self.mostrar_status()
-                return True
-            elif comando == 'help':
-                self.mostrar_ajuda()
-                return True
-            elif comando == 'stats':
-                self.mostrar_estatisticas()
-                return True
-            elif comando in ['quit', 'exit', 'q']:
-                self.executando = False
-                return True
-            else:
+            handler = self._comandos_globais.get(comando)
+            if handler is None:
                 print(f"❌ Comando inválido: '{comando}'. Digite 'help' para ajuda")
                 return False
+            handler()
+            return True
         
         # Valida módulo
         if modulo not in self.modulos_enderecos:
@@ -244,131 +353,137 @@ class MonitorMultiModulo:
 
     def _executar_comando_modulo(self, cmd_base, modulo, porta):
         """Executa comando específico em um módulo"""
-        config = self.configuracoes_modulos[modulo]
-        
-        # Toggle manual direto: "1.5"
-        if cmd_base == "":
-            if 1 <= porta <= config['max_portas']:
-                if self.modulos[modulo].toggle_canal(porta):
-                    print(f"✅ Toggle M{modulo}.S{porta}")
-                    self.contadores[modulo]['comandos'] += 1
-                    return True
-                else:
-                    print(f"❌ Erro toggle M{modulo}.S{porta}")
-                    return False
-        
-        # Ligar saída: "on2.3"
-        elif cmd_base == "on":
-            if 1 <= porta <= config['max_portas']:
-                if self.modulos[modulo].liga_canal(porta):
-                    print(f"✅ M{modulo}.S{porta} LIGADA")
-                    self.contadores[modulo]['comandos'] += 1
-                    return True
-                else:
-                    print(f"❌ Erro ao ligar M{modulo}.S{porta}")
-                    return False
-        
-        # Desligar saída: "off1.12"
-        elif cmd_base == "off":
-            if 1 <= porta <= config['max_portas']:
-                if self.modulos[modulo].desliga_canal(porta):
-                    print(f"✅ M{modulo}.S{porta} DESLIGADA")
-                    self.contadores[modulo]['comandos'] += 1
-                    return True
-                else:
-                    print(f"❌ Erro ao desligar M{modulo}.S{porta}")
-                    return False
+        handler = self._comandos_modulo.get(cmd_base)
+        if handler is not None:
+            # Handlers retornam None quando a porta está fora da faixa do módulo
+            resultado = handler(modulo, porta)
+            if resultado is not None:
+                return resultado
         
-        # Ligar todas: "all_on.2"
-        elif cmd_base == "all_on":
-            if self.modulos[modulo].liga_tudo():
-                print(f"✅ Todas saídas M{modulo} LIGADAS")
+        print(f"❌ Comando não reconhecido: '{cmd_base}'")
+        return False
+
+    def _cmd_toggle(self, modulo, porta):
+        """Toggle manual direto: 1.5"""
+        if 1 <= porta <= self.max_portas[modulo]:
+            if self.modulos[modulo].toggle_canal(porta):
+                print(f"✅ Toggle M{modulo}.S{porta}")
                 self.contadores[modulo]['comandos'] += 1
                 return True
-            else:
-                print(f"❌ Erro ao ligar todas M{modulo}")
-                return False
-        
-        # Desligar todas: "all_off.1"
-        elif cmd_base == "all_off":
-            if self.modulos[modulo].desliga_tudo():
-                print(f"✅ Todas saídas M{modulo} DESLIGADAS")
+            print(f"❌ Erro toggle M{modulo}.S{porta}")
+            return False
+
+    def _cmd_on(self, modulo, porta):
+        """Ligar saída: on2.3"""
+        if 1 <= porta <= self.max_portas[modulo]:
+            if self.modulos[modulo].liga_canal(porta):
+                print(f"✅ M{modulo}.S{porta} LIGADA")
                 self.contadores[modulo]['comandos'] += 1
                 return True
-            else:
-                print(f"❌ Erro ao desligar todas M{modulo}")
-                return False
-        
-        # Ler entradas: "in1"
-        elif cmd_base == "in":
-            if not config['tem_entradas']:
-                print(f"❌ M{modulo} não possui entradas")
-                return False
-            
-            entradas = self.modulos[modulo].le_status_entradas()
-            if entradas:
-                self.estados_entradas[modulo] = entradas
-                entradas_ativas = [i+1 for i, x in enumerate(entradas) if x]
-                print(f"📥 M{modulo} Entradas: {entradas_ativas if entradas_ativas else 'Nenhuma'}")
+            print(f"❌ Erro ao ligar M{modulo}.S{porta}")
+            return False
+
+    def _cmd_off(self, modulo, porta):
+        """Desligar saída: off1.12"""
+        if 1 <= porta <= self.max_portas[modulo]:
+            if self.modulos[modulo].desliga_canal(porta):
+                print(f"✅ M{modulo}.S{porta} DESLIGADA")
+                self.contadores[modulo]['comandos'] += 1
                 return True
-            else:
-                print(f"❌ Erro ao ler entradas M{modulo}")
-                return False
+            print(f"❌ Erro ao desligar M{modulo}.S{porta}")
+            return False
+
+    def _cmd_all_on(self, modulo, porta):
+        """Ligar todas: all_on.2"""
+        if self.modulos[modulo].liga_tudo():
+            print(f"✅ Todas saídas M{modulo} LIGADAS")
+            self.contadores[modulo]['comandos'] += 1
+            return True
+        print(f"❌ Erro ao ligar todas M{modulo}")
+        return False
+
+    def _cmd_all_off(self, modulo, porta):
+        """Desligar todas: all_off.1"""
+        if self.modulos[modulo].desliga_tudo():
+            print(f"✅ Todas saídas M{modulo} DESLIGADAS")
+            self.contadores[modulo]['comandos'] += 1
+            return True
+        print(f"❌ Erro ao desligar todas M{modulo}")
+        return False
+
+    def _cmd_in(self, modulo, porta):
+        """Ler entradas: in1"""
+        if not self.tem_entradas[modulo]:
+            print(f"❌ M{modulo} não possui entradas")
+            return False
         
-        # Ler saídas: "out1" ou "out1.5"
-        elif cmd_base == "out":
-            if porta is None:
-                # Lê todas as saídas
-                saidas = self.modulos[modulo].le_status_saidas_digitais()
-                if saidas:
-                    self.estados_saidas[modulo] = saidas[:config['max_portas']]
-                    saidas_ativas = [i+1 for i, x in enumerate(saidas[:config['max_portas']]) if x]
-                    print(f"📤 M{modulo} Saídas: {saidas_ativas if saidas_ativas else 'Nenhuma'}")
-                    return True
-                else:
-                    print(f"❌ Erro ao ler saídas M{modulo}")
-                    return False
-            else:
-                # Lê saída específica
-                status = self.modulos[modulo].le_status_saida_especifica(porta)
-                if status is not None:
-                    estado = "ON" if status else "OFF"
-                    print(f"📤 M{modulo}.S{porta}: {estado}")
-                    return True
-                else:
-                    print(f"❌ Erro ao ler saída M{modulo}.S{porta}")
-                    return False
+        entradas = self.modulos[modulo].le_mascara_entradas()
+        if entradas is None:
+            print(f"❌ Erro ao ler entradas M{modulo}")
+            return False
         
-        # Toggle configuração: "t2.3"
-        elif cmd_base == "t":
-            if not config['tem_entradas']:
-                print(f"❌ M{modulo} não possui entradas")
+        self.estados_entradas[modulo] = entradas
+        print(f"📥 M{modulo} Entradas: {_texto_portas(entradas)}")
+        return True
+
+    def _cmd_out(self, modulo, porta):
+        """Ler saídas: out1 ou out1.5"""
+        if porta is None:
+            # Lê todas as saídas
+            saidas = self.modulos[modulo].le_mascara_saidas()
+            if saidas is None:
+                print(f"❌ Erro ao ler saídas M{modulo}")
                 return False
-            if 1 <= porta <= 16:
-                idx = porta - 1
-                self.toggle_habilitado[modulo][idx] = not self.toggle_habilitado[modulo][idx]
-                status = "HABILITADO" if self.toggle_habilitado[modulo][idx] else "DESABILITADO"
-                print(f"✅ Toggle M{modulo}.E{porta}: {status}")
-                return True
+            self.estados_saidas[modulo] = saidas & self.mascara_saidas[modulo]
+            print(f"📤 M{modulo} Saídas: {_texto_portas(self.estados_saidas[modulo])}")
+            return True
         
-        print(f"❌ Comando não reconhecido: '{cmd_base}'")
-        return False
+        # Lê saída específica
+        status = self.modulos[modulo].le_status_saida_especifica(porta)
+        if status is None:
+            print(f"❌ Erro ao ler saída M{modulo}.S{porta}")
+            return False
+        estado = "ON" if status else "OFF"
+        print(f"📤 M{modulo}.S{porta}: {estado}")
+        return True
+
+    def _cmd_toggle_config(self, modulo, porta):
+        """Toggle configuração: t2.3"""
+        if not self.tem_entradas[modulo]:
+            print(f"❌ M{modulo} não possui entradas")
+            return False
+        if 1 <= porta <= 16:
+            bit = 1 << (porta - 1)
+            self.toggle_habilitado[modulo] ^= bit
+            status = "HABILITADO" if self.toggle_habilitado[modulo] & bit else "DESABILITADO"
+            print(f"✅ Toggle M{modulo}.E{porta}: {status}")
+            return True
 
     def processar_toggle_entradas(self, unit_id, entradas_atual, entradas_anterior):
-        """Processa toggles automáticos baseados em mudanças nas entradas"""
+        """Processa toggles automáticos baseados em mudanças nas entradas (bitmasks)"""
         toggles_executados = []
         
-        for i in range(16):
-            # Detecta borda de subida (0→1)
-            if entradas_anterior[i] == 0 and entradas_atual[i] == 1:
-                canal = i + 1
-                if self.toggle_habilitado[unit_id][i]:
-                    # Executa toggle na saída correspondente
-                    if self.modulos[unit_id].toggle_canal(canal):
-                        toggles_executados.append(f"Toggle M{unit_id} E{canal}→S{canal}")
-                        self.contadores[unit_id]['toggles'] += 1
-                    else:
-                        toggles_executados.append(f"ERRO Toggle M{unit_id} E{canal}→S{canal}")
+        # Bordas de subida (0→1) nas entradas com toggle habilitado
+        bordas = entradas_atual & ~entradas_anterior & self.toggle_habilitado[unit_id] & 0xFFFF
+        if not bordas:
+            return toggles_executados
+        
+        canais = []
+        while bordas:
+            bit_menor = bordas & -bordas
+            canais.append(bit_menor.bit_length())  # bit N -> canal N+1
+            bordas ^= bit_menor
+        
+        # Executa os toggles do ciclo de uma vez (canais consecutivos numa só escrita)
+        alternados = self.modulos[unit_id].toggle_canais(canais)
+        for canal in canais:
+            if canal in alternados:
+                toggles_executados.append(f"Toggle M{unit_id} E{canal}→S{canal}")
+            else:
+                toggles_executados.append(f"ERRO Toggle M{unit_id} E{canal}→S{canal}")
+        
+        with self.lock:
+            self.contadores[unit_id]['toggles'] += len(alternados)
         
         return toggles_executados
 
@@ -376,17 +491,21 @@ class MonitorMultiModulo:
         """Thread para leitura periódica de todos os módulos"""
         print("🔄 Thread leitura geral iniciada")
         ciclo = 0
+        proximo_ciclo = time.monotonic() + INTERVALO_LEITURA_MIN
         
         while self.executando:
             try:
                 ciclo += 1
-                # print(f"\n🔄 Ciclo #{ciclo} - {datetime.now().strftime('%H:%M:%S')}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"🔄 Ciclo #{ciclo} - {datetime.now().strftime('%H:%M:%S')}")
                 
-                with self.locks['modulos']:
-                    for unit_id in self.modulos_enderecos:
-                        self._ler_modulo(unit_id)
+                # Sem lock em volta do ciclo: comandos intercalam entre as leituras
+                for unit_id in self.modulos_enderecos:
+                    # Instante próprio de cada módulo: a leitura dos anteriores já consumiu tempo
+                    self._ler_modulo(unit_id, time.monotonic())
                 
-                time.sleep(INTERVALO_LEITURA)
+                # Cada módulo tem seu próprio agendamento; o ciclo só verifica quem está pronto
+                proximo_ciclo = self._aguardar_proximo_ciclo(proximo_ciclo, INTERVALO_LEITURA_MIN)
                 
             except Exception as e:
                 print(f"❌ Erro na thread leitura: {e}")
@@ -400,24 +519,45 @@ class MonitorMultiModulo:
             return
         
         print("🔄 Polling M1 iniciado")
+        # Mesmo polling adaptativo da leitura geral (_intervalo_entradas), com os limites do M1
+        intervalo = INTERVALO_POLLING_IN1
+        proximo_ciclo = time.monotonic() + intervalo
         
         while self.executando:
             try:
-                with self.locks['modulos']:
-                    entradas_atual = self.modulos[1].le_status_entradas()
-                    if entradas_atual and entradas_atual != self.estado_polling_in1:
-                        entradas_ativas = [i+1 for i, x in enumerate(entradas_atual) if x]
-                        print(f"🔄 M1 Mudança: {entradas_ativas if entradas_ativas else 'Nenhuma'}")
+                # Após falha, só volta a ler M1 quando o backoff vencer
+                if time.monotonic() >= self.proximo_poll_entradas[1]:
+                    entradas_atual = self.modulos[1].le_mascara_entradas()
+                    agora = time.monotonic()
+                    
+                    mudou = False
+                    with self.lock:
+                        if entradas_atual is None:
+                            # Falha não conta como repouso: o intervalo fica como está
+                            self._agendar_backoff(1)
+                        else:
+                            self.backoff_modulos[1] = 0.0
+                            entradas_anterior = self.estado_polling_in1
+                            mudou = entradas_atual != entradas_anterior
+                            if mudou:
+                                self.estado_polling_in1 = entradas_atual
+                                self.estados_entradas[1] = entradas_atual
+                            intervalo = self._registrar_leitura_entradas(1, agora, mudou)
+                    
+                    if mudou:
+                        linhas = [f"🔄 M1 Mudança: {_texto_portas(entradas_atual)}"]
                         
                         # Processa toggles automáticos
-                        toggles = self.processar_toggle_entradas(1, entradas_atual, self.estado_polling_in1)
-                        for toggle in toggles:
-                            print(f"   {toggle}")
+                        toggles = self.processar_toggle_entradas(1, entradas_atual, entradas_anterior)
+                        linhas.extend(f"   {toggle}" for toggle in toggles)
+                        
+                        # Uma única escrita no console por mudança
+                        print("\n".join(linhas))
                         
-                        self.estado_polling_in1 = entradas_atual[:]
-                        self.estados_entradas[1] = entradas_atual[:]
+                        # Rajada provável: não espera o resto do período longo de repouso
+                        proximo_ciclo = min(proximo_ciclo, time.monotonic() + intervalo)
                 
-                time.sleep(INTERVALO_POLLING_IN1)
+                proximo_ciclo = self._aguardar_proximo_ciclo(proximo_ciclo, intervalo)
                 
             except Exception as e:
                 print(f"❌ Erro polling M1: {e}")
@@ -425,16 +565,76 @@ class MonitorMultiModulo:
         
         print("🔄 Polling M1 finalizado")
 
-    def _ler_modulo(self, unit_id):
-        """Lê estado atual de um módulo específico"""
-        config = self.configuracoes_modulos[unit_id]
-        
+    def _aguardar_proximo_ciclo(self, proximo_ciclo, intervalo):
+        """Dorme até o deadline absoluto do próximo ciclo e retorna o deadline seguinte"""
+        espera = proximo_ciclo - time.monotonic()
+        if espera > 0:
+            self.evento_parada.wait(espera)  # Retorna na hora se o monitor for encerrado
+            return proximo_ciclo + intervalo
+        # Deadline estourado: recomeça a partir de agora em vez de emendar leituras para recuperar
+        if -espera >= intervalo:
+            # Só conta atraso de um período inteiro ou mais (pausas curtas de GC/barramento são ruído)
+            with self.lock:
+                self.ciclos_atrasados += 1
+        return time.monotonic() + intervalo
+
+    def _registrar_leitura_entradas(self, unit_id, agora, mudou):
+        """Registra uma leitura bem-sucedida das entradas e retorna o intervalo até o próximo poll (chamar com self.lock)"""
+        if mudou:
+            if self.ultima_mudanca_entradas[unit_id] is not None:
+                self.intervalos_mudancas[unit_id].append(agora - self.ultima_mudanca_entradas[unit_id])
+            self.ultima_mudanca_entradas[unit_id] = agora
+            self.ciclos_sem_mudanca[unit_id] = 0
+        else:
+            self.ciclos_sem_mudanca[unit_id] += 1
+        return self._intervalo_entradas(unit_id, agora)
+
+    def _intervalo_entradas(self, unit_id, agora):
+        """Intervalo até o próximo poll: mínimo logo após uma mudança, dobrando em repouso da base até o teto"""
+        minimo, base, teto = self.limites_intervalo[unit_id]
+        ciclos = self.ciclos_sem_mudanca[unit_id]
+        ultima = self.ultima_mudanca_entradas[unit_id]
+        if ultima is not None:
+            intervalos = self.intervalos_mudancas[unit_id]
+            if len(intervalos) >= AMOSTRAS_MIN_ADAPTATIVO:
+                # Rajada: a última mudança é mais recente que a mediana entre mudanças
+                if agora - ultima < sorted(intervalos)[len(intervalos) // 2]:
+                    return minimo
+            elif ciclos < CICLOS_REPOUSO:
+                return minimo
+        return min(teto, base * 2 ** (ciclos // CICLOS_REPOUSO))
+
+    def _ler_modulo(self, unit_id, agora):
+        """Lê estado atual de um módulo específico (agora = time.monotonic() antes da leitura dele)"""
         # Lê entradas (se tiver)
-        if config['tem_entradas'] and unit_id != 1:  # M1 tem polling próprio
-            entradas = self.modulos[unit_id].le_status_entradas()
-            if entradas:
+        if self.tem_entradas[unit_id] and unit_id != 1:  # M1 tem polling próprio
+            if agora < self.proximo_poll_entradas[unit_id]:
+                return
+            
+            # I/O fora do lock: o pymodbus serializa as transações no client compartilhado
+            entradas = self.modulos[unit_id].le_mascara_entradas()
+            
+            with self.lock:
+                if entradas is None:
+                    # Módulo fora do ar: espera o backoff em vez de travar todo ciclo
+                    self._agendar_backoff(unit_id)
+                    return
+                
+                self.backoff_modulos[unit_id] = 0.0
+                mudou = entradas != self.estados_entradas[unit_id]
+                if mudou and logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"M{unit_id} entradas: {_portas_ativas(self.estados_entradas[unit_id])} -> "
+                                 f"{_portas_ativas(entradas)}")
                 self.estados_entradas[unit_id] = entradas
                 self.contadores[unit_id]['leituras'] += 1
+                
+                self.proximo_poll_entradas[unit_id] = agora + self._registrar_leitura_entradas(unit_id, agora, mudou)
+
+    def _agendar_backoff(self, unit_id):
+        """Adia a próxima leitura de um módulo que falhou (backoff exponencial a partir de agora)"""
+        backoff = min(BACKOFF_MAX, max(BACKOFF_MIN, self.backoff_modulos[unit_id] * 2))
+        self.backoff_modulos[unit_id] = backoff
+        self.proximo_poll_entradas[unit_id] = time.monotonic() + backoff
 
     def thread_interface_comandos(self):
         """Thread para capturar comandos do usuário"""
@@ -449,78 +649,52 @@ class MonitorMultiModulo:
                 print(f"❌ Erro na interface: {e}")
 
     def mostrar_status(self):
-        """Mostra status atual de todos os módulos"""
-        tempo_execucao = time.time() - self.tempo_inicio
+        """Mostra status atual de todos os módulos (montado em memória, uma única escrita)"""
+        tempo_execucao = time.monotonic() - self.tempo_inicio
         
-        print(f"\n📊 STATUS MULTI-MÓDULO ({datetime.now().strftime('%H:%M:%S')})")
-        print("=" * 60)
+        linhas = [f"\n📊 STATUS MULTI-MÓDULO ({datetime.now().strftime('%H:%M:%S')})", "=" * 60]
         
         for unit_id in self.modulos_enderecos:
-            config = self.configuracoes_modulos[unit_id]
-            print(f"\n🔧 MÓDULO {unit_id}:")
+            linhas.append(f"\n🔧 MÓDULO {unit_id}:")
             
             # Entradas
-            if config['tem_entradas']:
-                entradas_ativas = [i+1 for i, x in enumerate(self.estados_entradas[unit_id]) if x]
-                print(f"   📥 Entradas: {entradas_ativas if entradas_ativas else 'Nenhuma'}")
-                
-                toggle_ativo = [i+1 for i, x in enumerate(self.toggle_habilitado[unit_id]) if x]
-                print(f"   🔄 Toggle: {toggle_ativo if toggle_ativo else 'Nenhum'}")
+            if self.tem_entradas[unit_id]:
+                linhas.append(f"   📥 Entradas: {_texto_portas(self.estados_entradas[unit_id])}")
+                linhas.append(f"   🔄 Toggle: {_texto_portas(self.toggle_habilitado[unit_id], 'Nenhum')}")
             else:
-                print(f"   📥 Entradas: N/A")
+                linhas.append(f"   📥 Entradas: N/A")
             
             # Saídas
-            saidas_ativas = [i+1 for i, x in enumerate(self.estados_saidas[unit_id]) if x]
-            print(f"   📤 Saídas: {saidas_ativas if saidas_ativas else 'Nenhuma'}")
+            linhas.append(f"   📤 Saídas: {_texto_portas(self.estados_saidas[unit_id])}")
             
             # Estatísticas
             stats = self.contadores[unit_id]
-            print(f"   📈 Stats: L:{stats['leituras']} C:{stats['comandos']} T:{stats['toggles']}")
+            linhas.append(f"   📈 Stats: L:{stats['leituras']} C:{stats['comandos']} T:{stats['toggles']}")
         
-        print(f"\n⏱️  Tempo execução: {tempo_execucao:.1f}s")
-        print("=" * 60)
+        linhas.append(f"\n⏱️  Tempo execução: {tempo_execucao:.1f}s | Ciclos atrasados: {self.ciclos_atrasados}")
+        linhas.append("=" * 60)
+        print("\n".join(linhas))
 
     def mostrar_estatisticas(self):
-        """Mostra estatísticas detalhadas de performance"""
-        print("\n📊 ESTATÍSTICAS DE PERFORMANCE:")
-        print("=" * 50)
+        """Mostra estatísticas detalhadas de performance (montado em memória, uma única escrita)"""
+        linhas = ["\n📊 ESTATÍSTICAS DE PERFORMANCE:", "=" * 50]
         
         for unit_id in self.modulos_enderecos:
             stats = self.modulos[unit_id].get_performance_stats()
-            print(f"🔧 MÓDULO {unit_id}:")
-            print(f"   • Tentativas conexão: {stats['connection_attempts']}")
-            print(f"   • Operações bem-sucedidas: {stats['successful_reads']}")
-            print(f"   • Operações falharam: {stats['failed_reads']}")
-            print(f"   • Taxa de sucesso: {stats['success_rate']:.1f}%")
-            print()
+            linhas.append(f"🔧 MÓDULO {unit_id}:")
+            linhas.append(f"   • Tentativas conexão: {stats['connection_attempts']}")
+            linhas.append(f"   • Operações bem-sucedidas: {stats['successful_reads']}")
+            linhas.append(f"   • Operações falharam: {stats['failed_reads']}")
+            linhas.append(f"   • Taxa de sucesso: {stats['success_rate']:.1f}%")
+            linhas.append("")
+        
+        print("\n".join(linhas))
 
     def mostrar_ajuda(self):
         """Mostra comandos disponíveis"""
-        print("\n📋 COMANDOS DISPONÍVEIS:")
-        print("┌─────────────────────────────────────────────────────┐")
-        print("│ CONTROLE DE SAÍDAS:                                 │")
-        print("│   1.5         : Toggle saída 5 do módulo 1         │")
-        print("│   on2.3       : Ligar saída 3 do módulo 2          │")
-        print("│   off1.12     : Desligar saída 12 do módulo 1      │")
-        print("│   all_on.2    : Ligar todas saídas do módulo 2     │")
-        print("│   all_off.1   : Desligar todas saídas do módulo 1  │")
-        print("├─────────────────────────────────────────────────────┤")
-        print("│ LEITURA:                                            │")
-        print("│   out1        : Ler todas saídas do módulo 1       │")
-        print("│   out1.5      : Ler saída 5 do módulo 1            │")
-        print("│   in1         : Ler entradas do módulo 1           │")
-        print("├─────────────────────────────────────────────────────┤")
-        print("│ CONFIGURAÇÃO:                                       │")
-        print("│   t1.3        : Toggle entrada 3 do módulo 1       │")
-        print("├─────────────────────────────────────────────────────┤")
-        print("│ INFORMAÇÕES:                                        │")
-        print("│   status      : Status de todos módulos            │")
-        print("│   stats       : Estatísticas de performance        │")
-        print("│   help        : Esta ajuda                         │")
-        print("│   quit        : Sair                               │")
-        print("└─────────────────────────────────────────────────────┘")
-        print(f"💡 Módulos: {self.modulos_enderecos}")
-        print(f"💡 Gateway: {self.gateway_ip}:{self.gateway_porta}")
+        print(f"{_AJUDA}\n"
+              f"💡 Módulos: {self.modulos_enderecos}\n"
+              f"💡 Gateway: {self.gateway_ip}:{self.gateway_porta}")
 
     def executar_monitor(self):
         """Inicia o monitor multi-módulo"""
@@ -530,9 +704,9 @@ class MonitorMultiModulo:
         print(f"   • Modo: {self.modo_operacao}")
         print(f"   • Gateway: {self.gateway_ip}:{self.gateway_porta}")
         print(f"   • Módulos: {self.modulos_enderecos}")
-        print(f"   • Intervalo leitura: {INTERVALO_LEITURA*1000:.0f}ms")
+        print(f"   • Intervalo leitura: {INTERVALO_LEITURA_MIN*1000:.0f}-{INTERVALO_LEITURA_MAX*1000:.0f}ms (adaptativo)")
         if POLLING_IN1_ATIVO:
-            print(f"   • Polling M1: {INTERVALO_POLLING_IN1*1000:.0f}ms")
+            print(f"   • Polling M1: {INTERVALO_POLLING_IN1_MIN*1000:.0f}-{INTERVALO_POLLING_IN1_MAX*1000:.0f}ms (adaptativo)")
         print("=" * 50)
         
         # Conecta aos módulos
@@ -540,7 +714,7 @@ class MonitorMultiModulo:
             print("❌ Falha na conexão")
             return
         
-        self.tempo_inicio = time.time()
+        self.tempo_inicio = time.monotonic()
         
         # Inicia threads
         self.threads['comandos'] = threading.Thread(target=self.thread_interface_comandos, daemon=True)
@@ -556,15 +730,19 @@ class MonitorMultiModulo:
         print("\n🔄 Monitor ativo! Digite 'help' para comandos")
         print("💡 Pressione Ctrl+C para parar")
         
-        # Loop principal
+        # Loop principal: dorme até o evento de parada. O timeout só existe para o
+        # Ctrl+C ser atendido no Windows, onde Event.wait() sem timeout não é interrompível
         try:
-            while self.executando:
-                time.sleep(0.1)
+            while not self.evento_parada.wait(timeout=1.0):
+                pass
         except KeyboardInterrupt:
             print("\n🛑 Interrompido pelo usuário")
+            self._encerrar()
+        
+        self._aguardar_threads()
         
         # Estatísticas finais
-        tempo_total = time.time() - self.tempo_inicio
+        tempo_total = time.monotonic() - self.tempo_inicio
         total_comandos = sum(stats['comandos'] for stats in self.contadores.values())
         total_toggles = sum(stats['toggles'] for stats in self.contadores.values())
         
@@ -575,8 +753,12 @@ class MonitorMultiModulo:
 
     def desconectar_todos(self):
         """Fecha conexões com todos os módulos"""
+        # Os módulos do mesmo gateway compartilham o client: fecha cada um uma única vez.
+        # close() é idempotente, então não é preciso consultar .connected antes.
+        fechados = set()
         for modulo in self.modulos.values():
-            if modulo.client and modulo.client.connected:
+            if modulo.client and id(modulo.client) not in fechados:
+                fechados.add(id(modulo.client))
                 modulo.disconnect()
         print("🔌 Conexões fechadas")
 